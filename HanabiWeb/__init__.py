@@ -1 +1 @@
-__all__ = ("cache", "hanabi")
+__all__ = ("analysis", "cache", "gamelog", "hanabi", "integrity")
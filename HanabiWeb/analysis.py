@@ -0,0 +1,103 @@
+"""
+Work out which cards in a Hanabi game are playable, critical or dead, and
+which informs a player could give.
+"""
+
+import collections
+
+from . import cache
+from . import card
+
+
+def _tops(played):
+    """
+    Return the highest rank played so far in each colour, 0 if none.
+    """
+    tops = dict.fromkeys(card.HanabiColour.__members__, 0)
+    for c in played:
+        tops[c['colour']] = max(tops[c['colour']], c['rank'])
+    return tops
+
+
+def classify(data):
+    """
+    Sort the kinds of card, as (colour, rank) pairs, by what they are good for.
+
+    Returns three sets: the kinds which can be played now; the kinds which can
+    still be played but have only one copy left; and the kinds which can never
+    be played, because they have been played already or every copy of them or
+    of a lower rank of their colour has been discarded.
+    """
+    tops = _tops(data[cache.played_key])
+    discarded = collections.Counter((c['colour'], c['rank'])
+                                    for c in data[cache.discards_key])
+
+    playable, critical, dead = set(), set(), set()
+    for colour, rank in card.KINDS:
+        kind = (colour, rank)
+        # A kind is out of reach once every copy of it, or of any rank
+        # between it and the top of its pile, has been discarded.
+        unreachable = any(discarded[(colour, r)] == card.COPIES[r]
+                          for r in range(tops[colour] + 1, rank + 1))
+        if rank <= tops[colour] or unreachable:
+            dead.add(kind)
+            continue
+        if rank == tops[colour] + 1:
+            playable.add(kind)
+        if card.COPIES[rank] - discarded[kind] == 1:
+            critical.add(kind)
+    return playable, critical, dead
+
+
+def _as_cards(kinds):
+    return [{'colour': colour, 'rank': rank}
+            for colour, rank in card.KINDS
+            if (colour, rank) in kinds]
+
+
+def _informs(hand):
+    """
+    Return every inform which touches at least one card in the hand, as
+    (field, value, positions) triples.
+    """
+    informs = []
+    for field, values in (('colour', card.HanabiColour.__members__),
+                          ('rank', card.COPIES)):
+        for value in values:
+            positions = [i for i, c in enumerate(hand) if c[field] == value]
+            if positions:
+                informs.append((field, value, positions))
+    return informs
+
+
+def analyse(data, player):
+    """
+    Analyse the game as seen by the given player.
+
+    The player's own hand is hidden from them, so only the other hands are
+    examined card by card. Informs are listed only while there is knowledge
+    available to give.
+    """
+    playable, critical, dead = classify(data)
+
+    hands = {}
+    informs = []
+    can_inform = data[cache.knowledge_key]['available'] > 0
+    for other, hand in data[cache.hands_key].items():
+        if other == player:
+            continue
+        kinds = [(c['colour'], c['rank']) for c in hand]
+        hands[other] = {
+            'playable': [i for i, k in enumerate(kinds) if k in playable],
+            'critical': [i for i, k in enumerate(kinds) if k in critical],
+            'dead': [i for i, k in enumerate(kinds) if k in dead]}
+        if can_inform:
+            informs.extend({'recipient': other, field: value,
+                            'positions': positions}
+                           for field, value, positions in _informs(hand))
+
+    return {'playable': _as_cards(playable),
+            'critical': _as_cards(critical),
+            'dead': _as_cards(dead),
+            'hands': hands,
+            'informs': informs}
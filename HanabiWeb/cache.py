@@ -15,6 +15,49 @@ knowledge_key = "knowledge"
 lives_key = "lives"
 deck_key = "deck"
 played_key = "played"
+# Counts the times the game has been stored. Older games have no version,
+# which counts as 0.
+version_key = "version"
+
+
+# libyaml's parser and emitter are several times faster, where available.
+class _Loader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
+    pass
+
+
+class _Dumper(getattr(yaml, 'CSafeDumper', yaml.SafeDumper)):
+    def ignore_aliases(self, data):
+        # Every copy of a card is the same object, but should be written out
+        # in full rather than as a reference to the first.
+        return isinstance(data, card.HanabiCard) or \
+            super().ignore_aliases(data)
+
+
+# Cards are stored as e.g. "!card Red 1".
+_card_tag = '!card'
+# Tag used for cards when they were stored as Python objects.
+_legacy_card_tag = ('tag:yaml.org,2002:python/object/new:'
+                    'HanabiWeb.card.HanabiCard')
+
+
+def _represent_card(dumper, c):
+    return dumper.represent_scalar(_card_tag,
+                                   '{} {}'.format(c['colour'], c['rank']))
+
+
+def _construct_card(loader, node):
+    colour, rank = loader.construct_scalar(node).split()
+    return card.HanabiCard(colour, int(rank))
+
+
+def _construct_legacy_card(loader, node):
+    items = loader.construct_mapping(node, deep=True)['dictitems']
+    return card.HanabiCard(items['colour'], items['rank'])
+
+
+_Dumper.add_representer(card.HanabiCard, _represent_card)
+_Loader.add_constructor(_card_tag, _construct_card)
+_Loader.add_constructor(_legacy_card_tag, _construct_legacy_card)
 
 _fieldnames = (players_key,
                hands_key,
@@ -25,6 +68,20 @@ _fieldnames = (players_key,
                deck_key)
 
 
+def perspective(data, player):
+    """
+    Return the given game data as seen by the given player.
+    """
+    if player not in data[players_key]:
+        err = "Player {} not in player list for this game.".format(player)
+        raise ValueError(err)
+    # The given player can't see their own hand, or the deck, but can see
+    # everything else.
+    seen = {k: v for k, v in data.items() if k != deck_key}
+    seen[hands_key] = {p: h for p, h in data[hands_key].items() if p != player}
+    return seen
+
+
 class GameDataStore:
     """
     Store complete information about a Hanabi game in a file.
@@ -35,43 +92,41 @@ class GameDataStore:
 
     def get(self):
         with open(self.filepath) as f:
-            data = yaml.load(f)
+            data = yaml.load(f, Loader=_Loader)
         return data
 
     def get_from_perspective(self, player):
         """
         Get the state of the game as seen by the given player.
         """
-        data = self.get()
-        if player not in data[players_key]:
-            err = "Player {} not in player list for this game.".format(player)
-            raise ValueError(err)
-        # The given player can't see their own hand, or the deck, but can see
-        # everything else.
-        del data[hands_key][player]
-        del data[deck_key]
-        return data
+        return perspective(self.get(), player)
 
     def replace(self, data):
+        data[version_key] = data.get(version_key, 0) + 1
+        text = yaml.dump(data, Dumper=_Dumper)
         with open(self.filepath, "w") as f:
-            yaml.dump(data, f)
+            f.write(text)
 
     def replace_field(self, field, data):
         existing = self.get()
         existing[field] = data
         self.replace(existing)
 
-    def create(self, players):
+    def create(self, players, deck=None):
         """
         Create a new Hanabi game, storing the data in the given file.
+
+        The cards are dealt from the end of deck, which defaults to a new
+        arrangement of the whole deck. Returns the data stored.
         """
-        deck_arrangement = card.get_deck_arrangement()
+        if deck is None:
+            deck = card.get_deck_arrangement()
         data = {players_key: players,
                 hands_key: {p: [] for p in players},
                 discards_key: [],
                 knowledge_key: {"used": 0, "available": 8},
                 lives_key: {"used": 0, "available": 3},
-                deck_key: deck_arrangement,
+                deck_key: deck,
                 played_key: []}
 
         # Deal out the cards
@@ -85,3 +140,4 @@ class GameDataStore:
                 data[hands_key][p].append(data[deck_key].pop())
 
         self.replace(data)
+        return data
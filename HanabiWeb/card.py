@@ -11,17 +11,71 @@ class HanabiColour(enum.Enum):
     Blue = 5
 
 
+# How many copies of each rank there are in each colour.
+COPIES = {1: 3, 2: 2, 3: 2, 4: 2, 5: 1}
+
+# Every kind of card, as (colour, rank) pairs.
+KINDS = tuple((c, r) for c in HanabiColour.__members__ for r in COPIES)
+
+
 class HanabiCard(dict):
+    """
+    An immutable card, which is a dict {'colour': ..., 'rank': ...} so that it
+    serialises to JSON as one.
+
+    There is exactly one instance of each kind of card: HanabiCard('Red', 1)
+    always returns the same object, so a game's hands and deck only hold
+    references to the shared instances.
+    """
+
+    __slots__ = ()
+    _instances = {}
+
+    def __new__(cls, colour, rank):
+        try:
+            return cls._instances[(colour, rank)]
+        except KeyError:
+            raise ValueError("No such card: {} {}".format(rank, colour))
+
+    def __init__(self, colour, rank):
+        # Everything is set up once, in _make.
+        pass
+
+    @classmethod
+    def _make(cls, colour, rank):
+        instance = dict.__new__(cls)
+        dict.__setitem__(instance, 'colour', colour)
+        dict.__setitem__(instance, 'rank', rank)
+        cls._instances[(colour, rank)] = instance
+
     def __str__(self):
         return "{} {}".format(self['rank'], self['colour'])
 
     def __repr__(self):
-        return "HanabiCard({}, {})".format(self.get('colour'), self.get('rank'))
+        return "HanabiCard({}, {})".format(self['colour'], self['rank'])
+
+    def __hash__(self):
+        return hash((self['colour'], self['rank']))
+
+    def __reduce__(self):
+        return HanabiCard, (self['colour'], self['rank'])
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("HanabiCard is immutable")
 
-    def __init__(self, colour=None, rank=None):
-        dict.__init__(self)
-        self['colour'] = colour
-        self['rank'] = rank
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
+for _colour, _rank in KINDS:
+    HanabiCard._make(_colour, _rank)
+del _colour, _rank
 
 
 def _random_derangement(n):
@@ -41,11 +95,10 @@ def _random_derangement(n):
                 return tuple(v)
 
 
-def get_deck_arrangement():
+def _all_cards():
     """
-    Return a derangement of the cards in the deck.
+    Return a list of every card in the deck, in a fixed order.
     """
-    deck_length = (3 + 2 * 3 + 1) * 5
     all_cards = [HanabiCard(colour=c, rank=r)
                  for c in HanabiColour.__members__
                  for r in range(1, 6)]
@@ -54,5 +107,25 @@ def get_deck_arrangement():
                       for r in range(1, 5)])
     all_cards.extend([HanabiCard(colour=c, rank=1)
                       for c in HanabiColour.__members__])
-    derangement = _random_derangement(deck_length)
-    return [all_cards[i] for i in derangement]
\ No newline at end of file
+    return all_cards
+
+
+def get_deck_arrangement():
+    """
+    Return a derangement of the cards in the deck.
+    """
+    all_cards = _all_cards()
+    derangement = _random_derangement(len(all_cards))
+    return [all_cards[i] for i in derangement]
+
+
+def get_shuffled_deck(seed=None):
+    """
+    Return the cards in the deck in a uniformly random order.
+
+    This is a single Fisher-Yates shuffle, so is much cheaper than
+    get_deck_arrangement. Given the same seed, the order is always the same.
+    """
+    all_cards = _all_cards()
+    random.Random(seed).shuffle(all_cards)
+    return all_cards
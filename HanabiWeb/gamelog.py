@@ -0,0 +1,193 @@
+"""
+Buffered writing of the per-game log files.
+
+Lines are held in memory and written out in batches, through a bounded pool of
+open file descriptors, rather than opening and closing the log file for every
+line.
+"""
+
+import atexit
+import collections
+import os
+import sys
+import threading
+import time
+
+
+class LogRecord(collections.namedtuple('LogRecord', ('message', 'fields'))):
+    """
+    One line of a game log: a format string and the values to fill it with.
+
+    The line is only formatted when it is written out.
+    """
+
+    def render(self):
+        return self.message.format(**self.fields)
+
+
+class GameLogWriter:
+    """
+    Write log records for many games, buffering them per game.
+
+    A game's buffer is written out when it holds max_buffered records, when
+    flush_interval seconds have passed since the last write-out, or when
+    flush() is called. Each write-out is a single write to the file. At most
+    max_open log files are kept open; the least recently used is closed to
+    make room for another.
+
+    If durable is true, every record is written out and synced to disk before
+    write() returns.
+    """
+
+    def __init__(self, path_for_game, max_open=64, max_buffered=100,
+                 flush_interval=1.0, durable=False):
+        self._path_for_game = path_for_game
+        self.max_open = max_open
+        self.max_buffered = max_buffered
+        self.flush_interval = flush_interval
+        self.durable = durable
+
+        # Guards the buffers and the descriptor pool. Writing to a file, and
+        # syncing it, happens outside this lock, under one of the per-game
+        # locks, so a slow disk only holds up games sharing that lock.
+        self._lock = threading.Lock()
+        self._game_locks = tuple(threading.Lock() for _ in range(64))
+        self._buffers = collections.defaultdict(list)
+        # Bytes of earlier write-outs which did not reach the file.
+        self._unwritten = {}
+        self._fds = collections.OrderedDict()
+        # Games whose descriptors are being written to, which must not be
+        # closed to make room in the pool.
+        self._writing = set()
+        self._flusher = None
+        atexit.register(self.close)
+
+    def write(self, game, message, **fields):
+        """
+        Log message for the given game, formatted with fields when written.
+        """
+        self.write_many(game, [LogRecord(message, fields)])
+
+    def write_many(self, game, records):
+        """
+        Log several records for the given game, keeping them together.
+        """
+        with self._lock:
+            buffer = self._buffers[game]
+            buffer.extend(records)
+            flush_now = self.durable or len(buffer) >= self.max_buffered
+            if not flush_now:
+                self._start_flusher()
+        if flush_now:
+            self._flush_game(game)
+
+    def flush(self, game=None):
+        """
+        Write out the buffered records for one game, or for every game.
+
+        If writing out any game's records fails, they stay buffered and the
+        other games are still written out; the first error is then raised.
+        """
+        with self._lock:
+            if game is None:
+                games = set(self._buffers) | set(self._unwritten)
+            else:
+                games = [game]
+        error = None
+        for g in games:
+            try:
+                self._flush_game(g)
+            except OSError as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def close(self):
+        """
+        Write out everything buffered and close all the log files.
+        """
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                while self._fds:
+                    _, fd = self._fds.popitem(last=False)
+                    os.close(fd)
+
+    def _flush_game(self, game):
+        with self._game_locks[hash(game) % len(self._game_locks)]:
+            with self._lock:
+                records = self._buffers.pop(game, ())
+                data = self._unwritten.pop(game, b'') + b''.join(
+                    '{}\n'.format(r.render()).encode() for r in records)
+                if not data:
+                    return
+                try:
+                    fd = self._fd(game)
+                except OSError:
+                    self._unwritten[game] = data
+                    raise
+                self._writing.add(game)
+
+            written = 0
+            try:
+                while written < len(data):
+                    written += os.write(fd, data[written:])
+                if self.durable:
+                    os.fsync(fd)
+            except OSError:
+                with self._lock:
+                    # Keep exactly the bytes which did not reach the file, so
+                    # that a line cut short is finished rather than repeated,
+                    # and reopen the file next time.
+                    if written < len(data):
+                        self._unwritten[game] = data[written:]
+                    self._writing.discard(game)
+                    self._close_fd(game)
+                raise
+            with self._lock:
+                self._writing.discard(game)
+
+    def _fd(self, game):
+        """
+        Return an open descriptor for the game's log file, opening it if need
+        be and closing the least recently used one if the pool is full.
+
+        Must be called with the lock held.
+        """
+        fd = self._fds.get(game)
+        if fd is not None:
+            self._fds.move_to_end(game)
+            return fd
+        if len(self._fds) >= self.max_open:
+            idle = next((g for g in self._fds if g not in self._writing),
+                        None)
+            if idle is not None:
+                self._close_fd(idle)
+        fd = os.open(self._path_for_game(game),
+                     os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._fds[game] = fd
+        return fd
+
+    def _close_fd(self, game):
+        fd = self._fds.pop(game, None)
+        if fd is not None:
+            os.close(fd)
+
+    def _start_flusher(self):
+        # Called with the lock held.
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_periodically,
+                                             name='hanabi-log-flusher',
+                                             daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                # The records are still buffered, to be tried again.
+                print("Could not write game log: {}".format(e),
+                      file=sys.stderr)
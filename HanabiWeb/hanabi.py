@@ -1,10 +1,14 @@
+import collections
 import os
 import re
+import threading
 
-from flask_restful import Resource, abort, reqparse
+from flask_restful import Resource, abort, inputs, reqparse
 
+from . import analysis
 from . import cache
 from . import card
+from . import gamelog
 
 _DATA_STORES = os.path.join(os.path.expanduser('~'), '.hanabi')
 _EXTENSION = '.han'
@@ -17,9 +21,17 @@ def _game_log_path(game_id):
     return os.path.join(_DATA_STORES, '{}.log'.format(game_id))
 
 
-def log(string, game):
-    with open(_game_log_path(game), 'a') as f:
-        f.write("{}\n".format(string))
+# Buffered writer for the per-game log files.
+game_log = gamelog.GameLogWriter(_game_log_path)
+
+
+def log(message, game, **fields):
+    """
+    Add a line to the log of the given game.
+
+    The message is formatted with the fields when the line is written out.
+    """
+    game_log.write(game, message, **fields)
 
 
 def _validate_game_id(game_id):
@@ -36,10 +48,17 @@ def _validate_game_exists(game_id):
     """
     Test whether a game exists. If not, raise 404 Not Found.
 
+    A game whose ID has been claimed but which is still being created has an
+    empty data file, and does not exist yet.
+
     This fully trusts game_id, and is not safe on unsanitised input.
     """
     data_path = _game_data_path(game_id)
-    if not os.path.exists(data_path):
+    try:
+        size = os.path.getsize(data_path)
+    except OSError:
+        size = 0
+    if size == 0:
         abort(404, message="Game {} not found.".format(game_id))
 
 
@@ -92,6 +111,74 @@ def _get_new_game_index():
     return indices[-1] + 1
 
 
+_new_game_lock = threading.Lock()
+
+
+def _claim_game_ids(count):
+    """
+    Reserve a block of count consecutive new game IDs, returning them.
+
+    Each ID is claimed by creating its empty data file, which fails if the
+    file already exists, so no other request or process can be given the
+    same IDs. If any ID in the block is taken, the block is released and a
+    new one found.
+    """
+    with _new_game_lock:
+        while True:
+            first_id = _get_new_game_index()
+            claimed = []
+            try:
+                for game_id in range(first_id, first_id + count):
+                    fd = os.open(_game_data_path(game_id),
+                                 os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                    os.close(fd)
+                    claimed.append(game_id)
+            except FileExistsError:
+                for game_id in claimed:
+                    os.remove(_game_data_path(game_id))
+                continue
+            return claimed
+
+
+def _release_game_ids(ids):
+    """
+    Give up claimed game IDs whose games were not created.
+    """
+    for game_id in ids:
+        try:
+            os.remove(_game_data_path(game_id))
+        except OSError:
+            pass
+
+
+def _creation_log(data):
+    """
+    Return the records logged when a game is created: the deck and the hands.
+    """
+    Record = gamelog.LogRecord
+    records = [Record('New game with players {players}',
+                      {'players': data[cache.players_key]}),
+               Record('Deck:', {})]
+    records.extend(Record('  {card}', {'card': c})
+                   for c in data[cache.deck_key])
+    records.append(Record('Hands:', {}))
+    for p in data[cache.players_key]:
+        records.append(Record('  {player}', {'player': p}))
+        records.extend(Record('    {card}', {'card': c})
+                       for c in data[cache.hands_key][p])
+    records.append(Record('-----', {}))
+    return records
+
+
+def _create_game(game_id, players, deck=None):
+    """
+    Store a new game under the given ID, and write its initial log.
+    """
+    data_store = cache.GameDataStore(_game_data_path(game_id))
+    data = data_store.create(players, deck=deck)
+    game_log.write_many(game_id, _creation_log(data))
+
+
 def _can_play(already_played, attempt_card):
     """
     Return True iff attempt_card can be played given that played are the played
@@ -109,10 +196,30 @@ def _can_play(already_played, attempt_card):
     return False
 
 
+def _move_parser():
+    """
+    Return a parser for the arguments of a play or discard.
+    """
+    parser = reqparse.RequestParser()
+    parser.add_argument('card_index', type=int, required=True)
+    parser.add_argument('with_state', type=inputs.boolean, default=False)
+    return parser
+
+
+def _move_response(result, data, player, with_state):
+    """
+    Return the result of a move or inform, along with the game state as the player now
+    sees it if they asked for it.
+    """
+    if not with_state:
+        return result
+    return {'result': result, 'state': cache.perspective(data, player)}
+
+
 class Discard(Resource):
     def post(self, game_id, player):
         """
-        Expects card_index as data.
+        Expects card_index as data, and optionally with_state=true.
         :param game_id:
         :param player:
         :return:
@@ -125,17 +232,15 @@ class Discard(Resource):
         data = data_store.get()
         player_hand = data[cache.hands_key][player]
 
-        parser = reqparse.RequestParser()
-        parser.add_argument('card_index', type=int, required=True)
-        args = parser.parse_args()
+        args = _move_parser().parse_args()
 
         if args.card_index < 0 or args.card_index >= len(player_hand):
             abort(400, message="Card {} not valid.".format(args.card_index))
 
         # Discard the card with given index.
         discarded_card = player_hand[args.card_index]
-        log("Player '{}' discarded card {}.".format(player, discarded_card),
-            game=game_id)
+        log("Player '{player}' discarded card {card}.", game_id,
+            player=player, card=discarded_card)
 
         data[cache.discards_key].append(discarded_card)
 
@@ -147,13 +252,13 @@ class Discard(Resource):
         player_hand[args.card_index] = drawn_card
 
         data_store.replace(data)
-        return True
+        return _move_response(True, data, player, args.with_state)
 
 
 class PlayCard(Resource):
     def post(self, game_id, player):
         """
-        Expects card_index as data.
+        Expects card_index as data, and optionally with_state=true.
         """
         _validate_game_id(game_id)
         _validate_game_exists(game_id)
@@ -163,9 +268,7 @@ class PlayCard(Resource):
         data = data_store.get()
         player_hand = data[cache.hands_key][player]
 
-        parser = reqparse.RequestParser()
-        parser.add_argument('card_index', type=int, required=True)
-        args = parser.parse_args()
+        args = _move_parser().parse_args()
 
         if args.card_index < 0 or args.card_index >= len(player_hand):
             abort(400, message="Card {} not valid.".format(args.card_index))
@@ -180,33 +283,36 @@ class PlayCard(Resource):
                 if data[cache.knowledge_key]['used'] != 0:
                     data[cache.knowledge_key]['used'] -= 1
                     data[cache.knowledge_key]['available'] += 1
-            log("Player '{}' played card {}.".format(player, card_to_play),
-                game=game_id)
+            log("Player '{player}' played card {card}.", game_id,
+                player=player, card=card_to_play)
         else:
             retval = False
-            log("Player '{}' played card {} wrongly.".format(player,
-                                                             card_to_play),
-                game=game_id)
+            log("Player '{player}' played card {card} wrongly.", game_id,
+                player=player, card=card_to_play)
             data[cache.discards_key].append(player_hand[args.card_index])
             if data[cache.lives_key]["available"] > 0:
                 data[cache.lives_key]["used"] += 1
                 data[cache.lives_key]["available"] -= 1
             if data[cache.lives_key]["available"] <= 0:
-                log("Game over.")
-                return "All lives exhausted. Game over."
+                log("Game over.", game_id)
+                # Nothing is stored, so the state is what is already on disk.
+                return _move_response("All lives exhausted. Game over.",
+                                      data_store.get(), player,
+                                      args.with_state)
 
         drawn_card = data[cache.deck_key].pop()
         player_hand[args.card_index] = drawn_card
 
         data_store.replace(data)
 
-        return retval
+        return _move_response(retval, data, player, args.with_state)
 
 
 class Inform(Resource):
     def post(self, game_id, player):
         """
         Expects recipient=Patrick and either colour=red or rank=5, for instance.
+        Optionally also with_state=true.
         """
         _validate_game_id(game_id)
         _validate_game_exists(game_id)
@@ -219,6 +325,7 @@ class Inform(Resource):
         parser.add_argument('recipient', type=str, required=True)
         parser.add_argument('colour', choices=tuple(_colours) + ("",))
         parser.add_argument('rank', type=int)
+        parser.add_argument('with_state', type=inputs.boolean, default=False)
         args = parser.parse_args()
 
         _validate_player_in_game(data, args.recipient)
@@ -238,11 +345,12 @@ class Inform(Resource):
                         if c['rank'] == args.rank]
             description = 'rank {}'.format(args.rank)
 
-        summary = "Player '{}' gave {} in hand of player '{}': positions {}."
-        summary = summary.format(player, description, args.recipient, matching)
-        log(summary, game_id)
+        log("Player '{player}' gave {description} in hand of player "
+            "'{recipient}': positions {matching}.", game_id,
+            player=player, description=description,
+            recipient=args.recipient, matching=matching)
 
-        return matching
+        return _move_response(matching, data, player, args.with_state)
 
 
 class Game(Resource):
@@ -284,25 +392,103 @@ class Game(Resource):
                             required=True)
         args = parser.parse_args()
 
-        new_id = _get_new_game_index()
-        data_path = _game_data_path(new_id)
-        data_store = cache.GameDataStore(data_path)
-        data_store.create(args['player'])
-        data = data_store.get()
+        new_id, = _claim_game_ids(1)
+        try:
+            _create_game(new_id, args['player'])
+        except Exception:
+            _release_game_ids([new_id])
+            raise
 
-        log('New game with players {}'.format(data[cache.players_key]), new_id)
-        log('Deck:', new_id)
-        for c in data[cache.deck_key]:
-            log('  {}'.format(str(c)), new_id)
-        log('Hands:', new_id)
-        for p in data[cache.players_key]:
-            log('  {}'.format(p), new_id)
-            for c in data[cache.hands_key][p]:
-                log('    {}'.format(str(c)), new_id)
+        return {'id': new_id}
 
-        log('-----', new_id)
 
-        return {'id': new_id}
+class Games(Resource):
+    def put(self):
+        """
+        Create many games at once, returning their IDs in order.
+
+        Expects JSON {"games": [{"players": ["bob", "sue"], "seed": 3}, ...]}.
+        The seed is optional; games with the same seed and players are dealt
+        identically.
+        """
+        parser = reqparse.RequestParser()
+        parser.add_argument('games', type=list, location='json',
+                            required=True,
+                            help='List of games, each {players, seed}')
+        args = parser.parse_args()
+
+        for i, game in enumerate(args.games):
+            if not isinstance(game, dict):
+                abort(400, message="Game {} is not an object.".format(i))
+            players = game.get('players')
+            if (not isinstance(players, list) or
+                    not 2 <= len(players) <= 5 or
+                    len(set(players)) != len(players) or
+                    not all(isinstance(p, str) for p in players)):
+                abort(400, message="Game {} needs between 2 and 5 distinct "
+                                   "player names.".format(i))
+            seed = game.get('seed')
+            if seed is not None and not isinstance(seed, int):
+                abort(400, message="Seed of game {} is not an "
+                                   "integer.".format(i))
+
+        ids = _claim_game_ids(len(args.games))
+        created = 0
+        try:
+            for game_id, game in zip(ids, args.games):
+                deck = card.get_shuffled_deck(game.get('seed'))
+                _create_game(game_id, game['players'], deck=deck)
+                created += 1
+        except Exception:
+            # Don't leave the empty files of the games not created behind.
+            _release_game_ids(ids[created:])
+            raise
+
+        return {'ids': ids}
+
+
+# Analyses already made, by (game, player, version), least recently used first.
+_analyses = collections.OrderedDict()
+_analyses_lock = threading.Lock()
+_MAX_ANALYSES = 1024
+
+
+def _analyse(game_id, player, data):
+    """
+    Analyse the game from the player's perspective, reusing the analysis of
+    the same version of the game if there is one.
+    """
+    key = (game_id, player, data.get(cache.version_key, 0))
+    with _analyses_lock:
+        if key in _analyses:
+            _analyses.move_to_end(key)
+            return _analyses[key]
+    result = analysis.analyse(data, player)
+    with _analyses_lock:
+        _analyses[key] = result
+        while len(_analyses) > _MAX_ANALYSES:
+            _analyses.popitem(last=False)
+    return result
+
+
+class Analysis(Resource):
+    def get(self, game_id, player):
+        """
+        Return the cards which are playable, critical or dead, and every inform
+        the player could give.
+
+        :return: Dictionary of the analysis.
+            {playable: [cards], critical: [cards], dead: [cards],
+             hands: {player1: {playable: [indices], critical: [indices],
+                               dead: [indices]}},
+             informs: [{recipient: player1, colour: Red, positions: [0, 2]}]}
+        """
+        _validate_game_id(game_id)
+        _validate_game_exists(game_id)
+
+        data = cache.GameDataStore(_game_data_path(game_id)).get()
+        _validate_player_in_game(data, player)
+        return _analyse(game_id, player, data)
 
 
 class History(Resource):
@@ -311,6 +497,7 @@ class History(Resource):
         _validate_game_exists(game_id)
 
         path = _game_log_path(game_id)
+        game_log.flush(game_id)
 
         if not os.path.exists(path):
             return []
@@ -0,0 +1,235 @@
+"""
+Check stored games for broken invariants, and repair what can be repaired.
+"""
+
+import collections
+
+from . import cache
+from . import card
+
+
+# Number of cards dealt to each player, by number of players.
+_HAND_SIZES = {2: 5, 3: 5, 4: 4, 5: 4}
+
+# Total number of each kind of token.
+_TOKENS = {cache.knowledge_key: 8, cache.lives_key: 3}
+
+
+def _is_hand(cards):
+    return (isinstance(cards, list) and
+            all(isinstance(c, card.HanabiCard) for c in cards))
+
+
+def _is_tokens(tokens):
+    return (isinstance(tokens, dict) and
+            all(isinstance(tokens.get(k), int) and
+                not isinstance(tokens.get(k), bool)
+                for k in ('used', 'available')))
+
+
+def _malformed(data):
+    """
+    Return a list of descriptions of the fields which are missing or do not
+    have the right type.
+    """
+    missing = [f for f in cache._fieldnames if f not in data]
+    if missing:
+        return ['missing fields {}'.format(', '.join(missing))]
+
+    problems = []
+    players = data[cache.players_key]
+    if (not isinstance(players, list) or
+            not all(isinstance(p, str) for p in players)):
+        problems.append('players is not a list of names')
+    hands = data[cache.hands_key]
+    if (not isinstance(hands, dict) or
+            not all(_is_hand(h) for h in hands.values())):
+        problems.append('hands is not a set of lists of cards')
+    for key in (cache.deck_key, cache.discards_key, cache.played_key):
+        if not _is_hand(data[key]):
+            problems.append('{} is not a list of cards'.format(key))
+    for key in _TOKENS:
+        if not _is_tokens(data[key]):
+            problems.append('{} is not a count of tokens used and '
+                            'available'.format(key))
+    return problems
+
+
+def _piles(data):
+    """
+    Return every list of cards in the game.
+    """
+    return ([data[cache.deck_key], data[cache.discards_key],
+             data[cache.played_key]] +
+            list(data[cache.hands_key].values()))
+
+
+def _card_counts(data):
+    return collections.Counter((c['colour'], c['rank'])
+                               for pile in _piles(data)
+                               for c in pile)
+
+
+def _misplayed(played):
+    """
+    Return the indices of the cards in the played pile which could not have
+    been played, because a card of the same colour and rank was played before
+    or the rank below had not been played.
+    """
+    tops = dict.fromkeys(card.HanabiColour.__members__, 0)
+    bad = []
+    for i, c in enumerate(played):
+        if c['rank'] == tops[c['colour']] + 1:
+            tops[c['colour']] = c['rank']
+        else:
+            bad.append(i)
+    return bad
+
+
+def check(data):
+    """
+    Return a list of descriptions of the invariants the game data breaks.
+
+    If the data is malformed, only that is reported.
+    """
+    problems = _malformed(data)
+    if problems:
+        return problems
+
+    counts = _card_counts(data)
+    total = sum(counts.values())
+    expected_total = sum(card.COPIES[rank] for _, rank in card.KINDS)
+    if total != expected_total:
+        problems.append('{} cards instead of {}'.format(total,
+                                                        expected_total))
+    for colour, rank in card.KINDS:
+        if counts[(colour, rank)] != card.COPIES[rank]:
+            problems.append('{} copies of {} {} instead of {}'.format(
+                counts[(colour, rank)], rank, colour, card.COPIES[rank]))
+
+    for key, total in _TOKENS.items():
+        used, available = data[key]['used'], data[key]['available']
+        if used < 0 or available < 0 or used + available != total:
+            problems.append('{} tokens: {} used and {} available, of '
+                            '{}'.format(key, used, available, total))
+
+    players = data[cache.players_key]
+    hands = data[cache.hands_key]
+    if len(players) not in _HAND_SIZES:
+        problems.append('{} players'.format(len(players)))
+    for p in players:
+        if p not in hands:
+            problems.append("no hand for player '{}'".format(p))
+        elif len(hands[p]) != _HAND_SIZES.get(len(players)):
+            problems.append("player '{}' holds {} cards".format(
+                p, len(hands[p])))
+    for p in hands:
+        if p not in players:
+            problems.append("hand for unknown player '{}'".format(p))
+
+    for i in _misplayed(data[cache.played_key]):
+        problems.append('played card {} ({}) could not have been '
+                        'played'.format(i, data[cache.played_key][i]))
+
+    return problems
+
+
+def _is_move(line):
+    return line.startswith("Player '") and (
+        ' played card ' in line or ' discarded card ' in line)
+
+
+def check_log(data, lines):
+    """
+    Return a list of descriptions of the ways the game's log, given as an
+    iterable of lines, disagrees with the game data.
+
+    Every play and discard in the log should have put a card on the played or
+    discard pile, except a move which ends the game: that is logged but not
+    stored, and players may go on to end the game again. Older servers did
+    not log the game over, so a log ending in a wrong play, while the game
+    has one life left, is taken to end with such a move too.
+    """
+    problems = []
+    moves = 0
+    game_overs = 0
+    # Whether the last move was a wrong play with no game over after it.
+    ends_wrongly = False
+    empty = True
+    for i, line in enumerate(lines):
+        line = line.rstrip('\n')
+        empty = False
+        if i == 0 and not line.startswith('New game with players'):
+            problems.append('log does not start with the new game')
+        if _is_move(line):
+            moves += 1
+            ends_wrongly = line.endswith(' wrongly.')
+        elif line == 'Game over.':
+            game_overs += 1
+            ends_wrongly = False
+    if empty:
+        return ['log is empty']
+
+    if _malformed(data):
+        return problems
+    stored = (len(data[cache.played_key]) + len(data[cache.discards_key]) +
+              game_overs)
+    if ends_wrongly and data[cache.lives_key]['available'] == 1:
+        stored += 1
+    if moves != stored:
+        problems.append('log has {} plays and discards but {} are '
+                        'stored'.format(moves, stored))
+    return problems
+
+
+def repair(data):
+    """
+    Repair the game data in place, as far as possible.
+
+    Tokens are brought back within their totals, impossible plays are moved
+    to the discard pile, missing cards are put at the bottom of the deck and
+    surplus ones are taken out of the deck or discard pile, and short hands
+    are dealt up from the deck. Returns a list of descriptions of the repairs.
+    """
+    if _malformed(data):
+        return []
+
+    repairs = []
+
+    for key, total in _TOKENS.items():
+        tokens = data[key]
+        used = min(max(tokens['used'], 0), total)
+        if (used, total - used) != (tokens['used'], tokens['available']):
+            repairs.append('reset {} tokens to {} used'.format(key, used))
+            data[key] = {'used': used, 'available': total - used}
+
+    played = data[cache.played_key]
+    for i in reversed(_misplayed(played)):
+        repairs.append('moved {} from played to discards'.format(played[i]))
+        data[cache.discards_key].append(played.pop(i))
+
+    counts = _card_counts(data)
+    deck = data[cache.deck_key]
+    for colour, rank in card.KINDS:
+        c = card.HanabiCard(colour, rank)
+        surplus = counts[(colour, rank)] - card.COPIES[rank]
+        for pile in (deck, data[cache.discards_key]):
+            while surplus > 0 and c in pile:
+                pile.remove(c)
+                surplus -= 1
+                repairs.append('removed surplus {}'.format(c))
+        for _ in range(-surplus):
+            # Cards are drawn from the end of the deck.
+            deck.insert(0, c)
+            repairs.append('added missing {} to the deck'.format(c))
+
+    players = data[cache.players_key]
+    hand_size = _HAND_SIZES.get(len(players))
+    if hand_size is not None:
+        for p in players:
+            hand = data[cache.hands_key].setdefault(p, [])
+            while len(hand) < hand_size and deck:
+                hand.append(deck.pop())
+                repairs.append("dealt {} to player '{}'".format(hand[-1], p))
+
+    return repairs
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Check every stored game for broken invariants, optionally repairing them.
+
+Games are checked in parallel by a pool of processes, a chunk at a time, so
+memory use does not grow with the number of games. Stop the server first:
+games being played, or created in the last second, may appear inconsistent.
+
+    python checkgames.py --repair
+"""
+
+import argparse
+import concurrent.futures
+import os
+import re
+import sys
+import time
+
+from HanabiWeb import cache
+from HanabiWeb import integrity
+
+
+_DATA_STORES = os.path.join(os.path.expanduser('~'), '.hanabi')
+_game_file = re.compile(r'([0-9]+)\.han$')
+
+
+def _game_ids(directory):
+    """
+    Yield the ID of each game stored in the directory.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            match = _game_file.match(entry.name)
+            if match and entry.is_file():
+                yield match.group(1)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def check_game(directory, game_id, repair=False):
+    """
+    Check one game and its log, repairing the game if asked to.
+
+    Returns a pair of lists: the problems found, and the repairs made.
+    """
+    data_store = cache.GameDataStore(os.path.join(directory,
+                                                  game_id + '.han'))
+    try:
+        data = data_store.get()
+    except Exception as e:
+        return ['cannot be read: {}'.format(' '.join(str(e).split()))], []
+    if not isinstance(data, dict):
+        return ['is not a game'], []
+
+    problems = integrity.check(data)
+    log_path = os.path.join(directory, game_id + '.log')
+    if os.path.exists(log_path):
+        with open(log_path) as f:
+            problems.extend(integrity.check_log(data, f))
+    else:
+        problems.append('has no log')
+
+    repairs = []
+    if repair and problems:
+        repairs = integrity.repair(data)
+        if repairs:
+            data_store.replace(data)
+    return problems, repairs
+
+
+def _check_chunk(directory, game_ids, repair):
+    """
+    Check a chunk of games, returning how many were checked and the results
+    for those with problems.
+    """
+    results = []
+    for game_id in game_ids:
+        try:
+            problems, repairs = check_game(directory, game_id, repair=repair)
+        except Exception as e:
+            # One bad game must not stop the rest of the chunk.
+            problems = ['could not be checked: {!r}'.format(e)]
+            repairs = []
+        if problems:
+            results.append((game_id, problems, repairs))
+    return len(game_ids), results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory', nargs='?', default=_DATA_STORES,
+                        help='where the games are stored')
+    parser.add_argument('--repair', action='store_true',
+                        help='fix what can be fixed, rewriting the games')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='number of processes')
+    parser.add_argument('--chunk', type=int, default=256,
+                        help='games given to a process at a time')
+    args = parser.parse_args()
+
+    checked = broken = repaired = 0
+    start = time.perf_counter()
+    chunks = _chunks(_game_ids(args.directory), args.chunk)
+    # Only a few chunks per process are in flight at once.
+    max_pending = 2 * args.workers
+
+    with concurrent.futures.ProcessPoolExecutor(args.workers) as pool:
+        pending = set()
+        while True:
+            for game_ids in chunks:
+                pending.add(pool.submit(_check_chunk, args.directory,
+                                        game_ids, args.repair))
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                count, results = future.result()
+                checked += count
+                for game_id, problems, repairs in results:
+                    broken += 1
+                    repaired += bool(repairs)
+                    for problem in problems:
+                        print('Game {}: {}'.format(game_id, problem))
+                    for r in repairs:
+                        print('Game {}: repaired: {}'.format(game_id, r))
+
+    elapsed = time.perf_counter() - start
+    print('Checked {} games in {:.1f}s ({:.0f} games/s).'.format(
+        checked, elapsed, checked / elapsed if elapsed else 0),
+        file=sys.stderr)
+    print('{} with problems, {} repaired.'.format(broken, repaired),
+          file=sys.stderr)
+    return 1 if broken > repaired else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
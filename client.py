@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 
-import os
+import asyncio
+import concurrent.futures
 import enum
+import functools
+import json
+import os
+import threading
 
 import requests
 
@@ -84,16 +89,54 @@ def get_action():
             yield (_recognised_actions[words[0]], remaining)
 
 
-def request_gamestate(server, player, gameid):
+_local = threading.local()
+
+# Threads used by the asyncio API to run the blocking requests calls.
+_MAX_WORKERS = 256
+_executor = None
+
+
+def get_session():
+    """
+    Return this thread's requests.Session, creating it on first use.
+
+    Reusing a session keeps the HTTP connection to the server alive between
+    requests, instead of opening a fresh one every time.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        _local.session = session
+    return session
+
+
+def _url(server, *parts):
+    """
+    Build the URL of an API endpoint, e.g. _url(server, 'game', 3, 'bob').
+    """
+    return 'http://{}/{}'.format(server, '/'.join(str(p) for p in parts))
+
+
+def request_new_game(server, players, session=None):
+    """
+    Create a new game with the given list of player names.
+
+    Returns the ID of the new game.
+    """
+    session = session or get_session()
+    r = session.put(_url(server, 'game'), data={'player': players})
+    return r.json()['id']
+
+
+def request_gamestate(server, player, gameid, session=None):
     """
     Requests the current game state from the player's perspective.
 
     If successful, returns a dictionary as output by the REST API for the
     /game/<id>/<player> endpoint.
     """
-    print("Requesting game state...")
-    url = server + '/game/{id}/{player}'.format(id=gameid, player=player)
-    r = requests.get('http://' + url)
+    session = session or get_session()
+    r = session.get(_url(server, 'game', gameid, player))
     js = r.json()
     return js
 
@@ -111,18 +154,17 @@ def get_top(cards, colour):
     return max(iter)
 
 
-def request_history(server, game_id, player=None):
+def request_history(server, game_id, player=None, session=None):
     """
     Request the history from the server from the point of view of a player.
 
     TODO: this API currently doesn't filter based on who is requesting. The
     server needs to be fixed to do that.
     """
-    print("Requesting history...")
-    url = server + '/history/{}'.format(game_id)
-    if player is not None:
-        url += '/{}'.format(player)
-    r = requests.get('http://' + url)
+    session = session or get_session()
+    parts = ('history', game_id) if player is None else ('history', game_id,
+                                                          player)
+    r = session.get(_url(server, *parts))
     return r.json()
 
 
@@ -192,35 +234,49 @@ def validate_args(numargs, args):
     return args
 
 
-def request_discard(server, player, id, card):
+def request_discard(server, player, id, card, session=None, with_state=False):
     """
     Discard a card.
 
     The card is specified as a zero-indexed card from the left positionally in
-    someone's hand.
+    someone's hand. If with_state is true, the server responds with the
+    outcome and the new game state, as {"result": ..., "state": ...}.
     """
-    url = server + '/discard/{id}/{player}'.format(id=id, player=player)
-    r = requests.post('http://' + url, data={'card_index': card})
+    session = session or get_session()
+    data = {'card_index': card}
+    if with_state:
+        data['with_state'] = 'true'
+    r = session.post(_url(server, 'discard', id, player), data=data)
     return r.text
 
 
-def request_play(server, player, id, card):
+def request_play(server, player, id, card, session=None, with_state=False):
     """
     Play a card.
 
     The card is specified as a zero-indexed card from the left positionally in
-    someone's hand.
+    someone's hand. If with_state is true, the server responds with the
+    outcome and the new game state, as {"result": ..., "state": ...}.
     """
-    url = server + '/play/{id}/{player}'.format(id=id, player=player)
-    r = requests.post('http://' + url, data={'card_index': card})
+    session = session or get_session()
+    data = {'card_index': card}
+    if with_state:
+        data['with_state'] = 'true'
+    r = session.post(_url(server, 'play', id, player), data=data)
     return r.text
 
 
-def request_inform(server, requester, player, id, colour=None, rank=None):
+def request_inform(server, requester, player, id, colour=None, rank=None,
+                   session=None, with_state=False):
     """
     Give a player information about a card.
+
+    If with_state is true, the server responds with the matching positions
+    and the game state, as {"result": ..., "state": ...}.
     """
     data = {'recipient': player}
+    if with_state:
+        data['with_state'] = 'true'
     if colour is None:
         assert(rank is not None)
         data['rank'] = rank
@@ -228,17 +284,140 @@ def request_inform(server, requester, player, id, colour=None, rank=None):
         assert(colour is not None)
         data['colour'] = colour.lower().capitalize()
 
-    url = server + '/inform/{id}/{player}'.format(id=id, player=requester)
-    r = requests.post('http://' + url, data=data)
+    session = session or get_session()
+    r = session.post(_url(server, 'inform', id, requester), data=data)
     return r.text
 
 
+class GameClient:
+    """
+    One player's view of one game, caching the last game state fetched.
+
+    Playing, discarding and giving information all ask the server to send
+    back the current state along with the outcome, so the cache is updated
+    without another request.
+    """
+
+    def __init__(self, server, player, game_id, session=None):
+        self.server = server
+        self.player = player
+        self.game_id = game_id
+        self.session = session
+        self._state = None
+
+    def gamestate(self, refresh=False):
+        """
+        Return the game state, only asking the server if it may have changed.
+
+        Pass refresh=True to pick up moves made by other players.
+        """
+        if refresh or self._state is None:
+            self._state = request_gamestate(self.server, self.player,
+                                            self.game_id, session=self.session)
+        return self._state
+
+    def _apply_move(self, text):
+        """
+        Take the new state out of the response to a move or inform,
+        returning the outcome as the server would have sent it without the
+        state.
+
+        If the response has no state, such as on an error, the cached state
+        is dropped and the response returned as it is.
+        """
+        try:
+            response = json.loads(text)
+        except ValueError:
+            response = None
+        if not isinstance(response, dict) or 'state' not in response:
+            self._state = None
+            return text
+        self._state = response['state']
+        return json.dumps(response['result'])
+
+    def play(self, card):
+        return self._apply_move(request_play(
+            self.server, self.player, self.game_id, card,
+            session=self.session, with_state=True))
+
+    def discard(self, card):
+        return self._apply_move(request_discard(
+            self.server, self.player, self.game_id, card,
+            session=self.session, with_state=True))
+
+    def inform(self, recipient, colour=None, rank=None):
+        return self._apply_move(request_inform(
+            self.server, self.player, recipient, self.game_id,
+            colour=colour, rank=rank, session=self.session, with_state=True))
+
+    def history(self, everything=False):
+        player = None if everything else self.player
+        return request_history(self.server, self.game_id, player=player,
+                               session=self.session)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=_MAX_WORKERS, thread_name_prefix='hanabi-client')
+    return _executor
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """
+    Run a blocking request function on the client's thread pool.
+
+    Each pool thread keeps its own session, so connections are reused across
+    the many coroutines sharing that thread.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+class AsyncGameClient:
+    """
+    Asyncio version of GameClient, so that one process can drive many seats.
+
+    Requests run on a shared thread pool of up to _MAX_WORKERS threads.
+    """
+
+    def __init__(self, server, player, game_id):
+        self._client = GameClient(server, player, game_id)
+
+    @property
+    def player(self):
+        return self._client.player
+
+    @property
+    def game_id(self):
+        return self._client.game_id
+
+    async def gamestate(self, refresh=False):
+        return await run_in_pool(self._client.gamestate, refresh=refresh)
+
+    async def play(self, card):
+        return await run_in_pool(self._client.play, card)
+
+    async def discard(self, card):
+        return await run_in_pool(self._client.discard, card)
+
+    async def inform(self, recipient, colour=None, rank=None):
+        return await run_in_pool(self._client.inform, recipient,
+                                 colour=colour, rank=rank)
+
+    async def history(self, everything=False):
+        return await run_in_pool(self._client.history, everything=everything)
+
+
 if __name__ == '__main__':
     game_id = get_game_id()
     player = get_player()
     server = get_server()
     print_welcome()
 
+    client = GameClient(server, player, game_id)
     actions = get_action()
 
     while True:
@@ -250,20 +429,18 @@ if __name__ == '__main__':
             continue
 
         if action == Actions.PRINT_GAMESTATE:
-            state = request_gamestate(server, player, game_id)
-            print_gamestate(state)
+            print("Requesting game state...")
+            print_gamestate(client.gamestate(refresh=True))
         elif action == Actions.DISCARD:
-            outcome = request_discard(server, player, game_id, args[0])
+            outcome = client.discard(args[0])
             if outcome.strip() != 'true':
                 print('May have failed: {}'.format(outcome))
-            state = request_gamestate(server, player, game_id)
-            print_gamestate(state)
+            print_gamestate(client.gamestate())
         elif action == Actions.PLAY:
-            outcome = request_play(server, player, game_id, args[0])
+            outcome = client.play(args[0])
             if outcome.strip() != 'true':
                 print('May have failed: {}'.format(outcome))
-            state = request_gamestate(server, player, game_id)
-            print_gamestate(state)
+            print_gamestate(client.gamestate())
         elif action == Actions.INFORM:
             recipient = args[0]
             which = input('Enter a colour string or a number: ')
@@ -271,16 +448,15 @@ if __name__ == '__main__':
                 int(which)
             except ValueError:
                 # which is a colour
-                outcome = request_inform(server, player, recipient, game_id, colour=which)
+                outcome = client.inform(recipient, colour=which)
             else:
-                outcome = request_inform(server, player, recipient, game_id, rank=which)
-            state = request_gamestate(server, player, game_id)
-            print_gamestate(state)
+                outcome = client.inform(recipient, rank=which)
+            print_gamestate(client.gamestate())
         elif action == Actions.HISTORY:
-            history = request_history(server, game_id, player=player)
-            print_history(history)
+            print("Requesting history...")
+            print_history(client.history())
         elif action == Actions.ALL_HISTORY:
-            history = request_history(server, game_id)
-            print_history(history)
+            print("Requesting history...")
+            print_history(client.history(everything=True))
 
-# TODO: need to pip install requests[security] when installing this
\ No newline at end of file
+# TODO: need to pip install requests[security] when installing this
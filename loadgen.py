@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Load generator for the Hanabi server.
+
+Plays many simultaneous games through the request functions in client.py,
+with think times between moves and spectating reads from the other players,
+and reports throughput, latency percentiles and error rates. Run the server
+with HANABI_NO_RATE_LIMIT=1 first, or almost every request will be refused.
+
+Example, sweeping from 1 to 50 simultaneous games of 3 players:
+
+    python loadgen.py localhost:5000 --games 1,5,10,20,50 --players 3
+"""
+
+import argparse
+import asyncio
+import collections
+import random
+import threading
+import time
+
+import client
+from HanabiWeb import cache
+from HanabiWeb import card
+
+
+_colours = tuple(card.HanabiColour.__members__)
+
+# Each move is one of these, chosen with the weights given by --mix.
+_moves = ('play', 'discard', 'inform')
+
+
+class Stats:
+    """
+    Latency and error counts for each kind of request.
+
+    Requests are recorded from many threads of the client's pool at once.
+    """
+
+    def __init__(self):
+        self.latencies = collections.defaultdict(list)
+        self.errors = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record(self, op, latency, ok):
+        with self._lock:
+            self.latencies[op].append(latency)
+            if not ok:
+                self.errors[op] += 1
+
+    def requests(self, op=None):
+        if op is None:
+            return sum(len(v) for v in self.latencies.values())
+        return len(self.latencies[op])
+
+    def error_count(self, op=None):
+        if op is None:
+            return sum(self.errors.values())
+        return self.errors[op]
+
+    def all_latencies(self, op=None):
+        if op is None:
+            return [l for v in self.latencies.values() for l in v]
+        return self.latencies[op]
+
+
+def percentile(values, p):
+    """
+    Return the p-th percentile (0 <= p <= 100) of the values, or None.
+    """
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def _is_ok(op, result):
+    """
+    Decide from the response body whether a request succeeded.
+
+    The client functions do not expose the status code, but every successful
+    response has a known shape.
+    """
+    if op == 'gamestate':
+        return isinstance(result, dict) and cache.players_key in result
+    if op == 'history':
+        return isinstance(result, list)
+    if op == 'new_game':
+        return isinstance(result, int)
+    if op == 'inform':
+        return result.strip().startswith('[')
+    # play and discard return true or false, or a game over message.
+    text = result.strip()
+    return text in ('true', 'false') or 'Game over' in text
+
+
+def _timed(stats, op, func, *args, **kwargs):
+    """
+    Call a blocking client function, recording its latency and outcome.
+
+    This runs on the client's thread pool, so the time measured does not
+    include waiting for a free thread.
+    """
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        stats.record(op, time.perf_counter() - start, False)
+        return None
+    ok = _is_ok(op, result)
+    stats.record(op, time.perf_counter() - start, ok)
+    return result if ok else None
+
+
+class Simulation:
+    """
+    Configuration for a load run, and the games it plays.
+    """
+
+    def __init__(self, server, players, think, reads_per_move,
+                 history_rate, mix, max_moves, seed=None):
+        self.server = server
+        self.players = players
+        self.think = think
+        self.reads_per_move = reads_per_move
+        self.history_rate = history_rate
+        self.mix = mix
+        self.max_moves = max_moves
+        self.random = random.Random(seed)
+
+    async def _call(self, stats, op, func, *args, **kwargs):
+        return await client.run_in_pool(_timed, stats, op, func,
+                                        *args, **kwargs)
+
+    def _think_time(self):
+        if self.think <= 0:
+            return 0
+        return self.random.expovariate(1 / self.think)
+
+    async def _spectate(self, stats, game_id, names, active, duration):
+        """
+        Have the waiting players look at the game while someone thinks.
+        """
+        waiting = [n for n in names if n != active]
+        reads = int(self.reads_per_move)
+        if self.random.random() < self.reads_per_move - reads:
+            reads += 1
+        delays = sorted(self.random.uniform(0, duration) for _ in range(reads))
+        elapsed = 0
+        for delay in delays:
+            await asyncio.sleep(delay - elapsed)
+            elapsed = delay
+            await self._call(stats, 'gamestate', client.request_gamestate,
+                             self.server, self.random.choice(waiting),
+                             game_id)
+
+    async def _move(self, stats, game_id, names, player, hand_size, mix):
+        """
+        Make one move for player.
+
+        Returns a pair (game continues, card was drawn).
+        """
+        move = self.random.choices(_moves, weights=mix)[0]
+        if move == 'inform':
+            recipient = self.random.choice([n for n in names if n != player])
+            if self.random.random() < 0.5:
+                info = {'colour': self.random.choice(_colours)}
+            else:
+                info = {'rank': self.random.randint(1, 5)}
+            await self._call(stats, 'inform', client.request_inform,
+                             self.server, player, recipient, game_id, **info)
+            return True, False
+
+        func = client.request_play if move == 'play' else \
+            client.request_discard
+        index = self.random.randrange(hand_size)
+        outcome = await self._call(stats, move, func,
+                                   self.server, player, game_id, index)
+        if outcome is None:
+            # The request failed, so no card was drawn.
+            return True, False
+        if 'Game over' in outcome:
+            return False, False
+        return True, outcome.strip() in ('true', 'false')
+
+    async def play_game(self, stats, game_number, deadline):
+        """
+        Create one game and play it until it ends, max_moves moves have been
+        made or the deadline passes.
+        """
+        names = ['p{}-{}'.format(game_number, i) for i in range(self.players)]
+        game_id = await self._call(stats, 'new_game', client.request_new_game,
+                                   self.server, names)
+        if game_id is None:
+            return
+        hand_size = 5 if self.players <= 3 else 4
+        # Each play or discard draws a card, and the server cannot draw from
+        # an empty deck, so once it is empty only informing is possible.
+        draws_left = 50 - hand_size * self.players
+        mix = self.mix
+
+        for turn in range(self.max_moves):
+            if time.monotonic() >= deadline:
+                return
+            player = names[turn % len(names)]
+            await self._call(stats, 'gamestate', client.request_gamestate,
+                             self.server, player, game_id)
+            think = self._think_time()
+            await asyncio.gather(
+                asyncio.sleep(think),
+                self._spectate(stats, game_id, names, player, think))
+            if self.random.random() < self.history_rate:
+                await self._call(stats, 'history', client.request_history,
+                                 self.server, game_id, player=player)
+
+            if draws_left == 0:
+                mix = (0, 0, 1)
+            going_on, drew = await self._move(stats, game_id, names, player,
+                                              hand_size, mix)
+            if not going_on:
+                return
+            if drew:
+                draws_left -= 1
+
+    async def _keep_playing(self, stats, game_number, deadline):
+        while time.monotonic() < deadline:
+            await self.play_game(stats, game_number, deadline)
+            game_number += 1
+
+    async def run(self, games, duration):
+        """
+        Keep the given number of games going for duration seconds.
+
+        Returns the Stats and the time actually taken: moves in flight at the
+        deadline are allowed to finish, so the run may overrun slightly.
+        """
+        stats = Stats()
+        deadline = time.monotonic() + duration
+        start = time.perf_counter()
+        # Give each concurrent game a disjoint range of numbers for naming its
+        # players in successive games.
+        await asyncio.gather(*[
+            self._keep_playing(stats, g * 1000000, deadline)
+            for g in range(games)])
+        return stats, time.perf_counter() - start
+
+
+def _ms(seconds):
+    return '-' if seconds is None else '{:.1f}'.format(seconds * 1000)
+
+
+def print_report(games, stats, elapsed):
+    """
+    Print throughput, latency percentiles and errors for each request type.
+    """
+    print('=== {} concurrent games, {:.1f}s ==='.format(games, elapsed))
+    print('{:<10} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8}'.format(
+        'request', 'count', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'errors'))
+    for op in sorted(stats.latencies) + [None]:
+        latencies = stats.all_latencies(op)
+        count = stats.requests(op)
+        errors = stats.error_count(op)
+        print('{:<10} {:>8} {:>8.1f} {:>8} {:>8} {:>8} {:>7.1%}'.format(
+            op or 'all', count, count / elapsed,
+            _ms(percentile(latencies, 50)),
+            _ms(percentile(latencies, 90)),
+            _ms(percentile(latencies, 99)),
+            errors / count if count else 0))
+
+
+def print_curve(rows):
+    """
+    Print the scaling curve from a concurrency sweep.
+    """
+    print('=== Scaling curve ===')
+    print('{:>6} {:>8} {:>8} {:>8} {:>8}'.format(
+        'games', 'req/s', 'p50 ms', 'p99 ms', 'errors'))
+    for games, stats, elapsed in rows:
+        latencies = stats.all_latencies()
+        count = stats.requests()
+        print('{:>6} {:>8.1f} {:>8} {:>8} {:>7.1%}'.format(
+            games, count / elapsed,
+            _ms(percentile(latencies, 50)),
+            _ms(percentile(latencies, 99)),
+            stats.error_count() / count if count else 0))
+
+
+def _parse_mix(text):
+    """
+    Parse e.g. "play=4,discard=3,inform=3" into weights ordered as _moves.
+    """
+    weights = dict.fromkeys(_moves, 0)
+    for part in text.split(','):
+        name, _, value = part.partition('=')
+        if name not in weights:
+            raise argparse.ArgumentTypeError('Unknown move {}'.format(name))
+        weights[name] = float(value)
+    return tuple(weights[m] for m in _moves)
+
+
+def _parse_games(text):
+    return [int(g) for g in text.split(',')]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('server', help='host:port of the server')
+    parser.add_argument('--games', type=_parse_games, default=[1],
+                        help='comma-separated numbers of concurrent games; '
+                             'more than one gives a scaling curve')
+    parser.add_argument('--players', type=int, default=3,
+                        choices=range(2, 6), help='players per game')
+    parser.add_argument('--duration', type=float, default=30,
+                        help='seconds to run at each concurrency level')
+    parser.add_argument('--think', type=float, default=2.0,
+                        help='mean think time before each move, in seconds')
+    parser.add_argument('--reads-per-move', type=float, default=2.0,
+                        help='mean game state reads by waiting players '
+                             'for each move')
+    parser.add_argument('--history-rate', type=float, default=0.1,
+                        help='chance of reading the history before a move')
+    parser.add_argument('--mix', type=_parse_mix,
+                        default=_parse_mix('play=4,discard=3,inform=3'),
+                        help='relative weights of the moves')
+    parser.add_argument('--max-moves', type=int, default=60,
+                        help='moves after which a game is abandoned')
+    parser.add_argument('--seed', type=int, help='random seed')
+    args = parser.parse_args()
+
+    simulation = Simulation(args.server, args.players, args.think,
+                            args.reads_per_move, args.history_rate, args.mix,
+                            args.max_moves, seed=args.seed)
+    rows = []
+    for games in args.games:
+        stats, elapsed = asyncio.run(simulation.run(games, args.duration))
+        print_report(games, stats, elapsed)
+        rows.append((games, stats, elapsed))
+    if len(rows) > 1:
+        print_curve(rows)
+
+
+if __name__ == '__main__':
+    main()
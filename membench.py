@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Compare the memory taken by games held in memory with the shared, immutable
+HanabiCard instances against one dict per card, as cards were stored before.
+
+    python membench.py --games 10000
+"""
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from HanabiWeb import cache
+from HanabiWeb import card
+
+
+class _DictCard(dict):
+    """
+    The old card representation: a separate mutable dict for every card.
+    """
+
+    def __init__(self, colour=None, rank=None):
+        dict.__init__(self)
+        self['colour'] = colour
+        self['rank'] = rank
+
+
+def _with_dict_cards(data):
+    """
+    Return a copy of the game data with every card a fresh _DictCard.
+    """
+    def convert(cards):
+        return [_DictCard(c['colour'], c['rank']) for c in cards]
+
+    data = dict(data)
+    for key in (cache.deck_key, cache.discards_key, cache.played_key):
+        data[key] = convert(data[key])
+    data[cache.hands_key] = {p: convert(h)
+                             for p, h in data[cache.hands_key].items()}
+    return data
+
+
+def _bytes_per_game(make_game, games):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = [make_game() for _ in range(games)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return (after - before) / games
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--games', type=int, default=10000,
+                        help='number of games to hold in memory')
+    parser.add_argument('--players', type=int, default=3,
+                        choices=range(2, 6))
+    args = parser.parse_args()
+
+    players = ['p{}'.format(i) for i in range(args.players)]
+    with tempfile.TemporaryDirectory() as directory:
+        data_store = cache.GameDataStore(os.path.join(directory, '0.han'))
+        data_store.create(players, deck=card.get_shuffled_deck(0))
+
+        interned = _bytes_per_game(data_store.get, args.games)
+        dicts = _bytes_per_game(lambda: _with_dict_cards(data_store.get()),
+                                args.games)
+
+    print('Games held: {}'.format(args.games))
+    print('One dict per card:     {:8.0f} bytes per game'.format(dicts))
+    print('Shared HanabiCards:    {:8.0f} bytes per game'.format(interned))
+    print('Saving:                {:8.1%}'.format(1 - interned / dicts))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
+import os
+
 import flask_limiter.util
 
 from flask import Flask
@@ -9,9 +11,16 @@ import HanabiWeb.hanabi
 
 app = Flask(__name__)
 api = Api(app)
+# Set HANABI_NO_RATE_LIMIT=1 to switch off rate limiting, e.g. when running
+# loadgen.py against a local server.
 limiter = Limiter(app,
                   key_func=flask_limiter.util.get_remote_address,
-                  default_limits=["300 per day", "10 per minute"])
+                  default_limits=["300 per day", "10 per minute"],
+                  enabled=not os.environ.get('HANABI_NO_RATE_LIMIT'))
+
+# Game logs are buffered for up to a second; set HANABI_DURABLE_LOGS=1 to have
+# every line written and synced to disk before the request returns.
+HanabiWeb.hanabi.game_log.durable = bool(os.environ.get('HANABI_DURABLE_LOGS'))
 
 
 HanabiWeb.hanabi.Game.method_decorators.append(limiter.limit("2 per minute"))
@@ -20,6 +29,9 @@ api.add_resource(HanabiWeb.hanabi.Game,
                  '/game/<int:game_id>',
                  '/game/<int:game_id>/<string:player>')
 
+HanabiWeb.hanabi.Games.method_decorators.append(limiter.limit("2 per minute"))
+api.add_resource(HanabiWeb.hanabi.Games, '/games')
+
 HanabiWeb.hanabi.Discard.method_decorators.append(limiter.limit("5 per minute"))
 api.add_resource(HanabiWeb.hanabi.Discard,
                  '/discard/<int:game_id>/<string:player>')
@@ -32,6 +44,10 @@ HanabiWeb.hanabi.Inform.method_decorators.append(limiter.limit("5 per minute"))
 api.add_resource(HanabiWeb.hanabi.Inform,
                  '/inform/<int:game_id>/<string:player>')
 
+HanabiWeb.hanabi.Analysis.method_decorators.append(limiter.limit('30 per minute'))
+api.add_resource(HanabiWeb.hanabi.Analysis,
+                 '/analysis/<int:game_id>/<string:player>')
+
 HanabiWeb.hanabi.History.method_decorators.append(limiter.limit('5 per minute'))
 api.add_resource(HanabiWeb.hanabi.History,
                  '/history/<int:game_id>',
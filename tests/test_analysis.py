@@ -0,0 +1,44 @@
+from HanabiWeb import analysis
+from HanabiWeb import cache
+from HanabiWeb import card
+
+
+def _game(played=(), discards=()):
+    return {cache.played_key: [card.HanabiCard(c, r) for c, r in played],
+            cache.discards_key: [card.HanabiCard(c, r) for c, r in discards]}
+
+
+def test_new_game():
+    playable, critical, dead = analysis.classify(_game())
+    assert playable == {(c, 1) for c in card.HanabiColour.__members__}
+    assert critical == {(c, 5) for c in card.HanabiColour.__members__}
+    assert dead == set()
+
+
+def test_played_cards_are_dead():
+    playable, critical, dead = analysis.classify(_game(played=[('Red', 1)]))
+    assert ('Red', 1) in dead
+    assert ('Red', 2) in playable
+
+
+def test_exhausted_kind_is_dead_and_not_playable():
+    discards = [('Red', 1)] * 3 + [('Blue', 5)]
+    playable, critical, dead = analysis.classify(_game(discards=discards))
+    assert ('Red', 1) not in playable
+    assert ('Red', 1) in dead
+    assert ('Blue', 5) in dead
+    assert ('Blue', 5) not in critical
+
+
+def test_cards_above_exhausted_kind_are_dead():
+    discards = [('Green', 2)] * 2
+    playable, critical, dead = analysis.classify(_game(discards=discards))
+    assert {('Green', r) for r in range(2, 6)} <= dead
+    assert ('Green', 1) in playable
+
+
+def test_last_copy_is_critical():
+    discards = [('White', 3)]
+    playable, critical, dead = analysis.classify(_game(discards=discards))
+    assert ('White', 3) in critical
+    assert ('White', 3) not in dead
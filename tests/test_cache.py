@@ -0,0 +1,20 @@
+from HanabiWeb import cache
+from HanabiWeb import card
+
+
+def test_version_counts_stores(tmp_path):
+    data_store = cache.GameDataStore(str(tmp_path / '0.han'))
+    data_store.create(['bob', 'sue'], deck=card.get_shuffled_deck(0))
+    assert data_store.get()[cache.version_key] == 1
+    data = data_store.get()
+    data_store.replace(data)
+    assert data_store.get()[cache.version_key] == 2
+
+
+def test_perspective_hides_own_hand_and_deck(tmp_path):
+    data_store = cache.GameDataStore(str(tmp_path / '0.han'))
+    data = data_store.create(['bob', 'sue'], deck=card.get_shuffled_deck(0))
+    seen = cache.perspective(data, 'bob')
+    assert list(seen[cache.hands_key]) == ['sue']
+    assert cache.deck_key not in seen
+    assert 'bob' in data[cache.hands_key]
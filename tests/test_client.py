@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+pytest.importorskip('requests')
+
+import client  # noqa: E402
+
+
+def _client(state=None):
+    c = client.GameClient('localhost:5000', 'bob', 3)
+    c._state = state
+    return c
+
+
+def test_apply_move_stores_returned_state():
+    c = _client({'old': True})
+    outcome = c._apply_move(json.dumps({'result': True,
+                                        'state': {'new': True}}))
+    assert outcome == 'true'
+    assert c.gamestate() == {'new': True}
+
+
+def test_apply_move_keeps_game_over_message():
+    c = _client()
+    message = "All lives exhausted. Game over."
+    outcome = c._apply_move(json.dumps({'result': message,
+                                        'state': {'new': True}}))
+    assert json.loads(outcome) == message
+    assert c._state == {'new': True}
+
+
+def test_apply_move_drops_state_on_error():
+    c = _client({'old': True})
+    text = json.dumps({'message': 'Card 7 not valid.'})
+    assert c._apply_move(text) == text
+    assert c._state is None
+
+
+def test_apply_move_drops_state_on_non_json():
+    c = _client({'old': True})
+    assert c._apply_move('<html>500</html>') == '<html>500</html>'
+    assert c._state is None
@@ -0,0 +1,118 @@
+import errno
+import os
+import time
+
+from HanabiWeb import gamelog
+
+
+def _writer(tmp_path, **kwargs):
+    return gamelog.GameLogWriter(
+        lambda game: str(tmp_path / '{}.log'.format(game)), **kwargs)
+
+
+def _read(tmp_path, game):
+    return (tmp_path / '{}.log'.format(game)).read_text()
+
+
+def test_records_are_buffered_until_flushed(tmp_path):
+    writer = _writer(tmp_path, flush_interval=60)
+    writer.write(1, "Player '{player}' played card {card}.",
+                 player='bob', card='1 Red')
+    assert not (tmp_path / '1.log').exists()
+    writer.flush(1)
+    assert _read(tmp_path, 1) == "Player 'bob' played card 1 Red.\n"
+    writer.close()
+
+
+def test_full_buffer_is_written_out(tmp_path):
+    writer = _writer(tmp_path, max_buffered=2, flush_interval=60)
+    writer.write(1, 'one')
+    writer.write(1, 'two')
+    assert _read(tmp_path, 1) == 'one\ntwo\n'
+    writer.close()
+
+
+def test_least_recently_used_file_is_closed(tmp_path):
+    writer = _writer(tmp_path, max_open=2, max_buffered=1, flush_interval=60)
+    writer.write(1, 'a')
+    writer.write(2, 'b')
+    writer.write(1, 'c')
+    writer.write(3, 'd')
+    assert list(writer._fds) == [1, 3]
+    writer.write(2, 'e')
+    assert list(writer._fds) == [3, 2]
+    writer.close()
+    assert _read(tmp_path, 1) == 'a\nc\n'
+    assert _read(tmp_path, 2) == 'b\ne\n'
+    assert _read(tmp_path, 3) == 'd\n'
+
+
+def test_records_are_written_out_on_interval(tmp_path):
+    writer = _writer(tmp_path, flush_interval=0.05)
+    writer.write(1, 'line')
+    deadline = time.monotonic() + 5
+    while not (tmp_path / '1.log').exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _read(tmp_path, 1) == 'line\n'
+    writer.close()
+
+
+def test_durable_writes_are_synced_at_once(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, 'fsync', synced.append)
+    writer = _writer(tmp_path, durable=True, flush_interval=60)
+    writer.write(1, 'line')
+    assert _read(tmp_path, 1) == 'line\n'
+    assert synced == [writer._fds[1]]
+    writer.close()
+
+
+def test_partly_written_line_is_finished_not_repeated(tmp_path, monkeypatch):
+    writer = _writer(tmp_path, max_buffered=1, flush_interval=60)
+    writer.write(1, 'hello 0')
+    fd = writer._fds[1]
+    real_write = os.write
+    calls = []
+
+    def short_then_full(target, data):
+        if target != fd:
+            return real_write(target, data)
+        calls.append(data)
+        if len(calls) == 1:
+            return real_write(target, data[:4])
+        raise OSError(errno.ENOSPC, 'No space left on device')
+
+    monkeypatch.setattr(os, 'write', short_then_full)
+    writer._buffers[1].extend([gamelog.LogRecord('line one', {}),
+                               gamelog.LogRecord('line two', {})])
+    try:
+        writer.flush(1)
+    except OSError as e:
+        assert e.errno == errno.ENOSPC
+    else:
+        assert False, 'flush did not fail'
+    monkeypatch.setattr(os, 'write', real_write)
+
+    writer.write(1, 'line three')
+    writer.flush()
+    assert _read(tmp_path, 1) == \
+        'hello 0\nline one\nline two\nline three\n'
+    writer.close()
+
+
+def test_flusher_survives_errors(tmp_path):
+    writer = gamelog.GameLogWriter(
+        lambda game: str(tmp_path / str(game) / 'x.log'), flush_interval=0.05)
+    writer.write('missing', 'lost for now')
+    time.sleep(0.15)
+    (tmp_path / 'ok').mkdir()
+    writer.write('ok', 'line')
+    deadline = time.monotonic() + 5
+    while (not (tmp_path / 'ok' / 'x.log').exists() and
+           time.monotonic() < deadline):
+        time.sleep(0.01)
+    assert (tmp_path / 'ok' / 'x.log').read_text() == 'line\n'
+    (tmp_path / 'missing').mkdir()
+    writer.flush()
+    assert (tmp_path / 'missing' / 'x.log').read_text() == 'lost for now\n'
+    writer.close()
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+pytest.importorskip('flask_restful')
+
+from flask import Flask  # noqa: E402
+from flask_restful import Api  # noqa: E402
+
+from HanabiWeb import analysis  # noqa: E402
+from HanabiWeb import cache  # noqa: E402
+from HanabiWeb import card  # noqa: E402
+from HanabiWeb import hanabi  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(hanabi, '_DATA_STORES', str(tmp_path))
+    app = Flask(__name__)
+    api = Api(app)
+    api.add_resource(hanabi.Game, '/game', '/game/<int:game_id>',
+                     '/game/<int:game_id>/<string:player>')
+    api.add_resource(hanabi.PlayCard, '/play/<int:game_id>/<string:player>')
+    api.add_resource(hanabi.Discard,
+                     '/discard/<int:game_id>/<string:player>')
+    api.add_resource(hanabi.Inform, '/inform/<int:game_id>/<string:player>')
+    return app.test_client()
+
+
+def _new_game(app):
+    r = app.put('/game', data={'player': ['bob', 'sue']})
+    return r.get_json()['id']
+
+
+def test_moves_without_state_are_unchanged(app):
+    game_id = _new_game(app)
+    r = app.post('/discard/{}/bob'.format(game_id), data={'card_index': 0})
+    assert r.get_json() is True
+
+
+def test_discard_returns_state(app):
+    game_id = _new_game(app)
+    r = app.post('/discard/{}/bob'.format(game_id),
+                 data={'card_index': 0, 'with_state': 'true'})
+    body = r.get_json()
+    assert body['result'] is True
+    assert body['state'] == app.get('/game/{}/bob'.format(game_id)).get_json()
+    assert 'bob' not in body['state']['hands']
+
+
+def test_inform_returns_state(app):
+    game_id = _new_game(app)
+    r = app.post('/inform/{}/bob'.format(game_id),
+                 data={'recipient': 'sue', 'rank': 1, 'with_state': 'true'})
+    body = r.get_json()
+    assert isinstance(body['result'], list)
+    assert body['state'] == app.get('/game/{}/bob'.format(game_id)).get_json()
+
+
+def test_game_over_returns_stored_state(app):
+    game_id = _new_game(app)
+    data_store = cache.GameDataStore(hanabi._game_data_path(game_id))
+    data = data_store.get()
+    data[cache.lives_key] = {'used': 2, 'available': 1}
+    data[cache.hands_key]['bob'][0] = card.HanabiCard('Red', 5)
+    data_store.replace(data)
+
+    r = app.post('/play/{}/bob'.format(game_id),
+                 data={'card_index': 0, 'with_state': 'true'})
+    body = r.get_json()
+    assert body['result'] == "All lives exhausted. Game over."
+    assert body['state'] == cache.perspective(data_store.get(), 'bob')
+
+
+def test_claimed_game_is_not_found_until_created(app):
+    game_id, = hanabi._claim_game_ids(1)
+    assert app.get('/game/{}/bob'.format(game_id)).status_code == 404
+    r = app.post('/play/{}/bob'.format(game_id), data={'card_index': 0})
+    assert r.status_code == 404
+
+
+def test_failed_batch_releases_claims(app, monkeypatch):
+    games_app = Flask(__name__)
+    Api(games_app).add_resource(hanabi.Games, '/games')
+    create = hanabi._create_game
+    calls = []
+
+    def failing_create(game_id, players, deck=None):
+        calls.append(game_id)
+        if len(calls) == 2:
+            raise OSError('disk full')
+        create(game_id, players, deck=deck)
+
+    monkeypatch.setattr(hanabi, '_create_game', failing_create)
+    games = [{'players': ['bob', 'sue']}] * 3
+    r = games_app.test_client().put('/games', json={'games': games})
+    assert r.status_code == 500
+    first = calls[0]
+    assert app.get('/game/{}'.format(first)).status_code == 200
+    for game_id in (first + 1, first + 2):
+        assert not os.path.exists(hanabi._game_data_path(game_id))
+
+
+def test_analysis_follows_game_version(app):
+    analysis_app = Flask(__name__)
+    Api(analysis_app).add_resource(hanabi.Analysis,
+                                   '/analysis/<int:game_id>/<string:player>')
+    analysis_app = analysis_app.test_client()
+    game_id = _new_game(app)
+
+    url = '/analysis/{}/sue'.format(game_id)
+    before = analysis_app.get(url).get_json()
+    assert analysis_app.get(url).get_json() == before
+    app.post('/discard/{}/bob'.format(game_id), data={'card_index': 0})
+    after = analysis_app.get(url).get_json()
+    data = cache.GameDataStore(hanabi._game_data_path(game_id)).get()
+    assert after == analysis.analyse(data, 'sue')
+    assert (game_id, 'sue', data[cache.version_key]) in hanabi._analyses
@@ -0,0 +1,66 @@
+from HanabiWeb import cache
+from HanabiWeb import card
+from HanabiWeb import integrity
+
+
+def _game():
+    data_store = cache.GameDataStore('/dev/null')
+    data_store.replace = lambda data: None
+    return data_store.create(['a', 'b'], deck=card.get_shuffled_deck(0))
+
+
+def _log(*moves):
+    return ['New game with players [a, b]\n', '-----\n'] + \
+        ['{}\n'.format(m) for m in moves]
+
+
+def test_new_game_is_consistent():
+    data = _game()
+    assert integrity.check(data) == []
+    assert integrity.check_log(data, _log()) == []
+
+
+def test_malformed_fields_are_reported():
+    data = _game()
+    data[cache.knowledge_key] = None
+    data[cache.played_key] = None
+    problems = integrity.check(data)
+    assert len(problems) == 2
+    assert integrity.check_log(data, _log()) == []
+    assert integrity.repair(data) == []
+
+
+def test_every_game_over_is_unstored():
+    data = _game()
+    data[cache.discards_key].append(data[cache.deck_key].pop())
+    data[cache.discards_key].append(data[cache.deck_key].pop())
+    log = _log("Player 'a' played card 2 Red wrongly.",
+               "Player 'b' played card 3 Red wrongly.",
+               "Player 'a' played card 4 Red wrongly.",
+               'Game over.',
+               "Player 'b' played card 5 Red wrongly.",
+               'Game over.')
+    assert integrity.check_log(data, log) == []
+
+
+def test_unlogged_game_over_is_unstored():
+    data = _game()
+    data[cache.lives_key] = {'used': 2, 'available': 1}
+    data[cache.discards_key].append(data[cache.deck_key].pop())
+    data[cache.discards_key].append(data[cache.deck_key].pop())
+    log = _log("Player 'a' played card 2 Red wrongly.",
+               "Player 'b' played card 3 Red wrongly.",
+               "Player 'a' played card 4 Red wrongly.")
+    assert integrity.check_log(data, log) == []
+
+    data[cache.lives_key] = {'used': 1, 'available': 2}
+    assert integrity.check_log(data, log)
+
+
+def test_repair_restores_tokens_and_cards():
+    data = _game()
+    data[cache.knowledge_key] = {'used': -1, 'available': 9}
+    data[cache.deck_key].pop()
+    assert integrity.check(data)
+    assert integrity.repair(data)
+    assert integrity.check(data) == []